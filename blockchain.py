@@ -1,11 +1,38 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 import hashlib
+import struct
 import time
 
-@dataclass
+# 区块头定长部分：高度、时间戳、前一区块哈希、POH哈希（哈希以32字节二进制存放）
+_HEADER = struct.Struct("<Qd32s32s")
+_EMPTY_ROOT = bytes(32)
+
+def _decode_hash(name: str, value: str) -> bytes:
+    """将64位十六进制哈希解码为32字节；格式不符时报错，避免 32s 静默补零或截断导致不同区块头哈希相同"""
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        raise ValueError(f"{name} 必须是十六进制字符串: {value!r}") from None
+    if len(raw) != 32:
+        raise ValueError(f"{name} 必须是32字节（64位十六进制）哈希，实际为 {len(raw)} 字节")
+    return raw
+
+def compute_merkle_root(transactions: List[str]) -> bytes:
+    """计算交易列表的默克尔根（两两SHA-256合并，奇数个时复制最后一个）"""
+    if not transactions:
+        return _EMPTY_ROOT
+    sha256 = hashlib.sha256
+    level = [sha256(tx.encode()).digest() for tx in transactions]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0]
+
+@dataclass(frozen=True, slots=True)
 class Block:
-    """区块结构"""
+    """区块结构（生成后不可变）"""
     height: int              # 区块高度
     timestamp: float         # 时间戳
     previous_hash: str       # 前一个区块的哈希
@@ -13,12 +40,29 @@ class Block:
     validator: str           # 出块验证者
     signature: str           # 验证者签名
     poh_hash: str           # POH哈希值
+    merkle_root: bytes = field(init=False, repr=False, compare=False)  # 交易默克尔根
+    _hash: str = field(init=False, repr=False, compare=False)         # 区块哈希
+
+    def __post_init__(self):
+        # 区块不可变，默克尔根与区块哈希在创建时计算一次
+        object.__setattr__(self, "merkle_root", compute_merkle_root(self.transactions))
+        object.__setattr__(self, "_hash", hashlib.sha256(self.preimage).hexdigest())
+
+    @property
+    def preimage(self) -> bytes:
+        """区块哈希的原像：定长二进制区块头 + 交易默克尔根 + 验证者"""
+        header = _HEADER.pack(
+            self.height,
+            self.timestamp,
+            _decode_hash("previous_hash", self.previous_hash),
+            _decode_hash("poh_hash", self.poh_hash)
+        )
+        return header + self.merkle_root + self.validator.encode()
 
     @property
     def hash(self) -> str:
-        """计算区块哈希"""
-        block_data = f"{self.height}{self.timestamp}{self.previous_hash}{self.transactions}{self.validator}{self.poh_hash}"
-        return hashlib.sha256(block_data.encode()).hexdigest()
+        """区块哈希"""
+        return self._hash
 
 class Blockchain:
     def __init__(self):
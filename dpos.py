@@ -1,16 +1,40 @@
 from dataclasses import dataclass
-from typing import List, Dict, Set, Optional
+from typing import Any, Callable, List, Dict, Set, FrozenSet, Optional, Tuple, Deque
+from array import array
+import heapq
+import itertools
+import logging
 import random
+import sys
 import time
 import asyncio
 from network import P2PNetwork, NetworkMessage
-from blockchain import Block, Blockchain
+from blockchain import Block, Blockchain, compute_merkle_root
 import psutil
-import statistics
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Mapping
 from transaction_pool import TransactionPool, Transaction
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+class _StakesView(Mapping):
+    """DPOS 质押表的只读实时视图：按槽位直接读取列式数组，不复制；写入会抛出 TypeError"""
+    __slots__ = ("_idx_of", "_stakes")
+    
+    def __init__(self, idx_of: Dict[str, int], stakes: array):
+        self._idx_of = idx_of
+        self._stakes = stakes
+        
+    def __getitem__(self, address: str) -> float:
+        return self._stakes[self._idx_of[address]]
+        
+    def __iter__(self):
+        return iter(self._idx_of)
+        
+    def __len__(self) -> int:
+        return len(self._idx_of)
+
+@dataclass(slots=True)
 class Validator:
     """验证者节点"""
     address: str          # 验证者地址
@@ -19,7 +43,7 @@ class Validator:
     is_active: bool      # 是否是活跃验证者
     last_block_time: float  # 上次出块时间
 
-@dataclass
+@dataclass(slots=True)
 class Vote:
     """投票记录"""
     voter: str           # 投票者地址
@@ -27,7 +51,7 @@ class Vote:
     amount: float        # 投票数量
     timestamp: float     # 投票时间
 
-@dataclass
+@dataclass(slots=True)
 class BlockMetrics:
     """区块性能指标"""
     block_height: int
@@ -36,12 +60,12 @@ class BlockMetrics:
     confirmation_time: float
     validator: str
     
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SystemMetrics:
     """系统资源指标"""
     cpu_usage: float
     memory_usage: float
-    network_io: Dict[str, int]
+    network_io: Any  # psutil.net_io_counters() 返回的具名元组，需要时再 _asdict()
     timestamp: float
 
 class DPOS:
@@ -55,12 +79,46 @@ class DPOS:
         """
         self.max_validators = max_validators
         self.block_interval = block_interval
+        self._interval_ns = max(1, round(block_interval * 1_000_000_000))  # 出块间隔（纳秒）
         
         self.validators: Dict[str, Validator] = {}
-        self.votes: List[Vote] = []
-        self.stakes: Dict[str, float] = {}
+        self.votes: Deque[Vote] = deque(maxlen=10_000)  # 最近的投票记录（仅供审计，票数统计见 _votes）
         self.current_epoch = 0
-        self.active_validators: Set[str] = set()
+        self.active_validators: FrozenSet[str] = frozenset()
+        self._active_tuple: Tuple[str, ...] = ()  # 排序后的活跃验证者，每轮选举更新一次
+        self._last_slot = -1       # 上次计算的出块槽位
+        self._last_choice = ""     # 上次计算的出块验证者
+        
+        # 账户的列式存储：每个地址分配一个槽位，质押量与票数按槽位存放在连续数组中
+        self._idx_of: Dict[str, int] = {}
+        self._addresses: List[str] = []
+        self._stakes = array('d')
+        self._votes = array('d')
+        self._validator_slots: List[int] = []  # 已注册验证者的槽位（按注册顺序）
+        self._validator_ids: Dict[str, int] = {}  # 验证者 -> 连续的验证者序号（即在 _validator_slots 中的位置）
+
+    @property
+    def stakes(self) -> Mapping[str, float]:
+        """各地址的质押数量（只读视图，修改质押请使用 stake）"""
+        return _StakesView(self._idx_of, self._stakes)
+
+    def get_stake(self, address: str) -> float:
+        """获取地址的质押数量，未质押时返回 0"""
+        idx = self._idx_of.get(address)
+        return self._stakes[idx] if idx is not None else 0.0
+
+    def _slot(self, address: str) -> int:
+        """获取地址的槽位，不存在时分配新槽位"""
+        idx = self._idx_of.get(address)
+        if idx is None:
+            # 驻留地址字符串，后续字典查找可走指针比较的快速路径
+            address = sys.intern(address)
+            idx = len(self._addresses)
+            self._idx_of[address] = idx
+            self._addresses.append(address)
+            self._stakes.append(0.0)
+            self._votes.append(0.0)
+        return idx
 
     def stake(self, address: str, amount: float) -> bool:
         """
@@ -69,33 +127,45 @@ class DPOS:
         if amount <= 0:
             return False
         
-        self.stakes[address] = self.stakes.get(address, 0) + amount
+        self._stakes[self._slot(address)] += amount
         return True
 
     def register_validator(self, address: str) -> bool:
         """
         注册成为验证者
         """
-        if address not in self.stakes or self.stakes[address] <= 0:
+        idx = self._idx_of.get(address)
+        if idx is None or self._stakes[idx] <= 0:
             return False
             
         if address not in self.validators:
+            address = self._addresses[idx]
             self.validators[address] = Validator(
                 address=address,
-                stake_amount=self.stakes[address],
+                stake_amount=self._stakes[idx],
                 votes=0,
                 is_active=False,
                 last_block_time=0
             )
+            self._validator_ids[address] = len(self._validator_slots)
+            self._validator_slots.append(idx)
         return True
 
+    def validator_id(self, address: str) -> Optional[int]:
+        """获取已注册验证者的整数ID（按注册顺序连续编号，与普通质押账户数量无关），未注册时返回 None"""
+        return self._validator_ids.get(address)
+
+    def address_of(self, validator_id: int) -> str:
+        """根据整数ID获取验证者地址（validator_id 的逆映射）"""
+        return self._addresses[self._validator_slots[validator_id]]
+
     def vote(self, voter: str, candidate: str, amount: float) -> bool:
         """
         投票给验证者
         """
-        if (voter not in self.stakes or 
-            amount > self.stakes[voter] or 
-            candidate not in self.validators):
+        voter_idx = self._idx_of.get(voter)
+        validator = self.validators.get(candidate)
+        if voter_idx is None or validator is None or amount > self._stakes[voter_idx]:
             return False
             
         vote = Vote(
@@ -106,38 +176,46 @@ class DPOS:
         )
         
         self.votes.append(vote)
-        self.validators[candidate].votes += amount
+        validator.votes += amount
+        self._votes[self._idx_of[candidate]] += amount
         return True
 
     def update_active_validators(self):
         """
         更新活跃验证者列表
         """
-        # 按投票数排序验证者
-        sorted_validators = sorted(
-            self.validators.values(),
-            key=lambda x: x.votes,
-            reverse=True
-        )
+        # 按投票数选出前 max_validators 个验证者（票数相同时先注册者优先）
+        votes = self._votes
+        top = heapq.nlargest(self.max_validators, self._validator_slots, key=votes.__getitem__)
         
-        # 选择前 max_validators 个作为活跃验证者
-        self.active_validators.clear()
-        for validator in sorted_validators[:self.max_validators]:
-            validator.is_active = True
-            self.active_validators.add(validator.address)
+        # 将原活跃验证者设置为非活跃
+        for address in self.active_validators:
+            self.validators[address].is_active = False
             
-        # 将其余验证者设置为非活跃
-        for validator in sorted_validators[self.max_validators:]:
-            validator.is_active = False
+        # 活跃验证者集合只在选举时整体替换为新的不可变快照
+        active = frozenset(self._addresses[idx] for idx in top)
+        for address in active:
+            self.validators[address].is_active = True
+        self.active_validators = active
+            
+        # 固定排序，保证各节点计算出的出块顺序一致
+        self._active_tuple = tuple(sorted(self.active_validators))
+        self._last_slot = -1
 
     def get_next_block_validator(self) -> str:
         """
         获取下一个出块验证者
         """
-        current_time = time.time()
-        active_list = sorted(list(self.active_validators))
-        slot = int(current_time / self.block_interval) % len(active_list)
-        return active_list[slot]
+        # 使用整数纳秒墙钟计算槽位：各节点共享同一时间基准，且无需浮点除法
+        slot = time.time_ns() // self._interval_ns
+        if slot == self._last_slot:
+            return self._last_choice
+            
+        active = self._active_tuple
+        choice = active[slot % len(active)] if active else ""
+        self._last_slot = slot
+        self._last_choice = choice
+        return choice
 
 class POHWithDPOS:
     """
@@ -181,8 +259,9 @@ class ConsensusEngine:
         height = len(self.blocks)
         previous_hash = self.blocks[-1].hash if self.blocks else "0" * 64
         
-        # 将交易记录到POH中
-        poh_hash = self.poh.tick(str(transactions)).hash
+        # 将交易的默克尔根记录到POH中
+        # 区块会自行计算默克尔根（不接受外部传入），这里单独计算一次用于POH打点
+        poh_hash = self.poh.tick_bytes(compute_merkle_root(transactions)).hash
         
         block = Block(
             height=height,
@@ -196,38 +275,52 @@ class ConsensusEngine:
         return block
 
 class ForkChoice:
-    """分叉选择"""
+    """分叉选择：在区块树上增量维护权重最大的有效链头（LMD-GHOST 风格）"""
     def __init__(self):
-        self.chains: Dict[str, List[Block]] = {}  # 不同的链
-        self.head: str = ""  # 当前最长链的ID
+        self.blocks: Dict[str, Block] = {}  # 区块哈希 -> 区块
+        self.weight: Dict[str, int] = {}    # 区块哈希 -> 从根到该区块的区块数
+        self.head: str = ""  # 当前权重最大的有效链头（区块哈希）
+        self._valid: Dict[str, bool] = {}   # 区块哈希 -> 从根到该区块的链是否有效（缓存）
         
     def add_block(self, block: Block) -> bool:
         """添加新区块，处理可能的分叉"""
-        chain_id = block.previous_hash
-        
-        if chain_id not in self.chains:
-            self.chains[chain_id] = []
+        block_hash = block.hash
+        if block_hash in self.blocks:
+            return True
+            
+        # 只需校验新区块与父区块的关系，父区块之前的部分已缓存
+        parent = self.blocks.get(block.previous_hash)
+        if parent is None:
+            # 父区块未知，作为区块树的新根
+            valid = True
+            weight = 1
+        else:
+            valid = self._valid[parent.hash] and block.height == parent.height + 1
+            weight = self.weight[parent.hash] + 1
             
-        self.chains[chain_id].append(block)
+        self.blocks[block_hash] = block
+        self.weight[block_hash] = weight
+        self._valid[block_hash] = valid
         
-        # 选择最长的有效链
-        self.select_best_chain()
+        # 新区块权重超过当前链头时切换链头
+        if valid and weight > self.weight.get(self.head, 0):
+            self.head = block_hash
         return True
         
     def select_best_chain(self):
-        """选择最长的有效链作为主链"""
-        max_length = 0
-        best_chain = ""
+        """重新选择权重最大的有效链头（add_block 已增量维护，此处为完整重算，仅在需要重建时调用，不要放进主循环）"""
+        max_weight = 0
+        best_head = ""
         
-        for chain_id, chain in self.chains.items():
-            if len(chain) > max_length and self.is_valid_chain(chain):
-                max_length = len(chain)
-                best_chain = chain_id
+        for block_hash, weight in self.weight.items():
+            if weight > max_weight and self._valid[block_hash]:
+                max_weight = weight
+                best_head = block_hash
                 
-        self.head = best_chain
+        self.head = best_head
 
     def is_valid_chain(self, chain: List[Block]) -> bool:
-        """验证链的有效性"""
+        """完整验证链的有效性（逐块遍历，用于导入外部链等场景）"""
         if not chain:
             return False
             
@@ -248,78 +341,145 @@ class ForkChoice:
 
 class BlockConfirmation:
     """区块确认机制"""
-    def __init__(self, required_confirmations: int = 3):
+    def __init__(self,
+                 required_confirmations: int = 3,
+                 id_of: Optional[Callable[[str], Optional[int]]] = None):
+        """
+        :param required_confirmations: 确认所需的投票数
+        :param id_of: 验证者地址到整数ID的映射（如 DPOS.validator_id），返回 None 的地址投票无效；
+                      不提供时按首次投票顺序自行分配序号
+        """
         self.required_confirmations = required_confirmations
-        self.block_votes: Dict[str, Set[str]] = {}  # 区块哈希 -> 验证者集合
+        self.block_votes: Dict[str, int] = {}  # 区块哈希 -> 已投票验证者ID的位图
+        self._id_of = id_of
+        self._validator_bits: Dict[str, int] = {}  # 验证者 -> 位图中的序号（未提供 id_of 时使用）
+        self._confirmed: Set[str] = set()  # 已达到确认条件的区块哈希
         
     def vote_block(self, block_hash: str, validator: str) -> bool:
         """验证者对区块投票"""
-        if block_hash not in self.block_votes:
-            self.block_votes[block_hash] = set()
-            
-        # 添加投票
-        self.block_votes[block_hash].add(validator)
+        if self._id_of is not None:
+            validator_id = self._id_of(validator)
+            if validator_id is None:
+                return False
+        else:
+            validator_id = self._validator_bits.get(validator)
+            if validator_id is None:
+                validator_id = self._validator_bits[validator] = len(self._validator_bits)
+        return self.vote_block_id(block_hash, validator_id)
+
+    def vote_block_id(self, block_hash: str, validator_id: int) -> bool:
+        """以整数ID对区块投票"""
+        # 添加投票（重复投票不改变位图）
+        self.block_votes[block_hash] = self.block_votes.get(block_hash, 0) | (1 << validator_id)
         
+        # 已确认的区块无需再统计
+        if block_hash in self._confirmed:
+            return True
+            
         # 返回是否达到确认条件
         return self.is_block_confirmed(block_hash)
         
     def is_block_confirmed(self, block_hash: str) -> bool:
         """检查区块是否已得到足够确认"""
-        if block_hash not in self.block_votes:
+        if block_hash in self._confirmed:
+            return True
+            
+        mask = self.block_votes.get(block_hash)
+        if mask is None:
             return False
             
         # 检查投票数量是否达到要求
-        votes_count = len(self.block_votes[block_hash])
-        print(f"当前投票数: {votes_count}, 需要投票数: {self.required_confirmations}")  # 添加调试信息
-        return votes_count >= self.required_confirmations
+        votes_count = mask.bit_count()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("当前投票数: %d, 需要投票数: %d", votes_count, self.required_confirmations)
+        if votes_count >= self.required_confirmations:
+            self._confirmed.add(block_hash)
+            return True
+        return False
 
     def get_block_votes(self, block_hash: str) -> int:
         """获取区块的投票数"""
-        if block_hash not in self.block_votes:
-            return 0
-        return len(self.block_votes[block_hash])
+        return self.block_votes.get(block_hash, 0).bit_count()
 
 class PerformanceMonitor:
     def __init__(self):
         self.metrics = defaultdict(list)
-        self.start_time = time.time()
-        self.block_metrics: List[BlockMetrics] = []
-        self.system_metrics: List[SystemMetrics] = []
-        self.transaction_latencies: List[float] = []
+        self.start_time = time.perf_counter()  # 仅用于计算耗时，不受系统时钟调整影响
+        self._process = psutil.Process()
+        psutil.cpu_percent(interval=None)  # 预热，之后的非阻塞调用返回两次采样间的平均值
+        # 只保留最近的明细记录以限制内存，全局统计以下方的累加值为准
+        self.block_metrics: Deque[BlockMetrics] = deque(maxlen=100_000)
+        self.system_metrics: Deque[SystemMetrics] = deque(maxlen=10_000)
+        self.transaction_latencies: Deque[float] = deque(maxlen=1_000_000)
+        
+        # 写入时累加的汇总值，生成报告时无需再遍历历史记录
+        self._block_count = 0
+        self._tx_total = 0
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._system_count = 0
+        self._cpu_sum = 0.0
+        self._mem_sum = 0.0
+        
+        self._sampler_task: Optional[asyncio.Task] = None
+        
+    def start_sampling(self, interval: float = 1.0):
+        """在后台按固定间隔采集系统指标，使出块循环不再承担psutil调用开销"""
+        if self._sampler_task is None or self._sampler_task.done():
+            self._sampler_task = asyncio.create_task(self._sample_loop(interval))
+            
+    def stop_sampling(self):
+        """停止后台采集"""
+        if self._sampler_task is not None:
+            self._sampler_task.cancel()
+            self._sampler_task = None
+            
+    async def _sample_loop(self, interval: float):
+        while True:
+            self.collect_system_metrics()
+            await asyncio.sleep(interval)
         
     def record_block_metrics(self, metrics: BlockMetrics):
         """记录区块性能指标"""
         self.block_metrics.append(metrics)
+        self._block_count += 1
+        self._tx_total += metrics.transactions_count
         
     def record_transaction_latency(self, latency: float):
         """记录交易延迟"""
         self.transaction_latencies.append(latency)
+        self._latency_count += 1
+        self._latency_sum += latency
         
     def collect_system_metrics(self):
         """收集系统性能指标"""
         metrics = SystemMetrics(
-            cpu_usage=psutil.cpu_percent(),
-            memory_usage=psutil.Process().memory_info().rss / 1024 / 1024,  # MB
-            network_io=dict(psutil.net_io_counters()._asdict()),
+            cpu_usage=psutil.cpu_percent(interval=None),
+            memory_usage=self._process.memory_info().rss / 1024 / 1024,  # MB
+            network_io=psutil.net_io_counters(),
             timestamp=time.time()
         )
         self.system_metrics.append(metrics)
+        self._system_count += 1
+        self._cpu_sum += metrics.cpu_usage
+        self._mem_sum += metrics.memory_usage
         
     def generate_report(self) -> dict:
         """生成性能报告"""
-        if not self.block_metrics:
+        if not self._block_count:
             return {}
             
-        total_time = time.time() - self.start_time
-        total_transactions = sum(m.transactions_count for m in self.block_metrics)
+        total_time = time.perf_counter() - self.start_time
+        latency_count = self._latency_count
+        system_count = self._system_count
         
         return {
-            "tps": total_transactions / total_time if total_time > 0 else 0,
-            "average_latency": statistics.mean(self.transaction_latencies) if self.transaction_latencies else 0,
-            "avg_cpu_usage": statistics.mean(m.cpu_usage for m in self.system_metrics) if self.system_metrics else 0,
-            "avg_memory_usage": statistics.mean(m.memory_usage for m in self.system_metrics) if self.system_metrics else 0,
-            "block_count": len(self.block_metrics),
-            "total_transactions": total_transactions
+            "tps": self._tx_total / total_time if total_time > 0 else 0,
+            "average_latency": self._latency_sum / latency_count if latency_count else 0,
+            "avg_cpu_usage": self._cpu_sum / system_count if system_count else 0,
+            "avg_memory_usage": self._mem_sum / system_count if system_count else 0,
+            "block_count": self._block_count,
+            "total_transactions": self._tx_total
         }
 
 class ConsensusSystem:
@@ -329,20 +489,24 @@ class ConsensusSystem:
         self.dpos = dpos
         self.network = P2PNetwork()
         self.fork_choice = ForkChoice()
-        self.confirmation = BlockConfirmation()
+        self.confirmation = BlockConfirmation(id_of=dpos.validator_id)
         self.blockchain = Blockchain()
         self.performance_monitor = PerformanceMonitor()
         self.transaction_pool = TransactionPool()
+        self._tx_seq = itertools.count()  # 交易序号，保证交易ID跨批次唯一
 
     def create_block(self, validator: str, transactions: List[str]) -> Block:
         """创建新区块"""
-        start_time = time.time()
+        timestamp = time.time()
+        start_time = time.perf_counter()
+        # 每次直接读取链尾（一次列表索引，区块哈希已预先计算），其他途径追加的区块也能跟上
         latest_block = self.blockchain.get_latest_block()
-        poh_hash = self.poh.tick(str(transactions)).hash
+        # 区块会自行计算默克尔根（不接受外部传入），这里单独计算一次用于POH打点
+        poh_hash = self.poh.tick_bytes(compute_merkle_root(transactions)).hash
         
         block = Block(
             height=latest_block.height + 1 if latest_block else 0,
-            timestamp=time.time(),
+            timestamp=timestamp,
             previous_hash=latest_block.hash if latest_block else "0" * 64,
             transactions=transactions,
             validator=validator,
@@ -354,7 +518,7 @@ class ConsensusSystem:
         metrics = BlockMetrics(
             block_height=block.height,
             transactions_count=len(transactions),
-            creation_time=time.time() - start_time,
+            creation_time=time.perf_counter() - start_time,
             confirmation_time=0,  # 将在确认时更新
             validator=validator
         )
@@ -375,21 +539,20 @@ class ConsensusSystem:
                     NetworkMessage("NEW_BLOCK", {"block": block})
                 )
                 
-            # 处分叉
-            self.fork_choice.select_best_chain()
-            
             # 确认区块
             self.process_confirmations()
             
             await asyncio.sleep(1)
 
     async def process_transactions(self, transactions: List[str]):
-        # 批量创建交易对象并直接处理
+        # 批量创建交易对象并直接处理（整批共用一次时间戳，ID由递增序号保证唯一）
+        now = time.time()
+        seq = self._tx_seq
         txs = [
             Transaction(
-                tx_id=f"tx_{time.time()}_{hash(tx_data)}",
+                tx_id=f"tx_{now}_{next(seq)}",
                 data=tx_data,
-                timestamp=time.time(),
+                timestamp=now,
                 gas_price=1.0,
                 size=len(tx_data.encode())
             )
@@ -398,17 +561,21 @@ class ConsensusSystem:
         
         # 并行处理交易
         chunk_size = 5000  # 增加批处理大小
-        tasks = []
-        
-        for i in range(0, len(txs), chunk_size):
-            chunk = txs[i:i + chunk_size]
-            task = asyncio.create_task(self._process_chunk(chunk))
-            tasks.append(task)
+        if len(txs) <= chunk_size:
+            # 只有一个批次时直接处理，省去任务创建与调度开销
+            await self._process_chunk(txs)
+        else:
+            tasks = []
             
-        await asyncio.gather(*tasks)
+            for i in range(0, len(txs), chunk_size):
+                chunk = txs[i:i + chunk_size]
+                task = asyncio.create_task(self._process_chunk(chunk))
+                tasks.append(task)
+                
+            await asyncio.gather(*tasks)
         
-        # 记录到POH中 (仅记录交易哈希,不做复杂计算)
-        self.poh.tick(str([tx.tx_id for tx in txs]))
+        # 记录到POH中 (仅记录交易ID,以\x00分隔直接拼接字节)
+        self.poh.tick_bytes(b"\x00".join(tx.tx_id.encode() for tx in txs))
 
     async def _process_chunk(self, chunk: List[Transaction]):
         """处理交易批次"""
@@ -421,24 +588,6 @@ class ConsensusSystem:
             
         return True
 
-class ProofOfHistory:
-    def __init__(self, difficulty: int = 4):  # 降低难度
-        self.difficulty = difficulty
-        self.history = []
-        self._buffer_size = 1000  # 添加缓冲区
-        self._hash_buffer = {}
-        
-    def _hash(self, previous_hash: str, data: Optional[str] = None) -> str:
-        # 使用缓冲区加速重复哈希计算
-        key = f"{previous_hash}:{data}"
-        if key in self._hash_buffer:
-            return self._hash_buffer[key]
-            
-        result = super()._hash(previous_hash, data)
-        if len(self._hash_buffer) < self._buffer_size:
-            self._hash_buffer[key] = result
-        return result
-
 # 使用示例
 def demo_poh_dpos():
     from poh import ProofOfHistory  # 导入之前实现的 POH
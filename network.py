@@ -1,5 +1,7 @@
 import time
-from typing import Dict, List
+from collections import deque
+from types import MappingProxyType
+from typing import Callable, Deque, Dict, List, Mapping, Tuple
 
 class NetworkMessage:
     """网络消息"""
@@ -12,7 +14,7 @@ class Node:
     """网络节点"""
     def __init__(self, node_id: str):
         self.id = node_id
-        self.messages: List[NetworkMessage] = []
+        self.messages: Deque[NetworkMessage] = deque()
 
     def receive_message(self, message: NetworkMessage):
         self.messages.append(message)
@@ -20,17 +22,37 @@ class Node:
 class P2PNetwork:
     """节点间通信网络"""
     def __init__(self):
-        self.peers: Dict[str, Node] = {}
+        self._peers: Dict[str, Node] = {}
         self.message_queue: List[NetworkMessage] = []
+        # 各节点接收方法的快照，节点增删时重建，广播时无需逐个查找绑定方法
+        self._receivers: Tuple[Callable[[NetworkMessage], None], ...] = ()
+
+    @property
+    def peers(self) -> Mapping[str, Node]:
+        """当前节点（只读视图，直接赋值会报错；增删请使用 add_peer/remove_peer）"""
+        return MappingProxyType(self._peers)
+
+    def add_peer(self, node: Node):
+        """加入节点"""
+        self._peers[node.id] = node
+        self._refresh_receivers()
+
+    def remove_peer(self, node_id: str):
+        """移除节点"""
+        if self._peers.pop(node_id, None) is not None:
+            self._refresh_receivers()
+
+    def _refresh_receivers(self):
+        self._receivers = tuple(peer.receive_message for peer in self._peers.values())
         
     def broadcast(self, message: NetworkMessage):
-        """广播消息到所有节点"""
-        for peer in self.peers.values():
-            peer.receive_message(message)
+        """广播消息到所有节点（节点需通过 add_peer/remove_peer 增删）"""
+        for receive in self._receivers:
+            receive(message)
             
     def handle_message(self, message: NetworkMessage):
         """处理接收到的消息"""
         if message.type == "NEW_BLOCK":
             self.handle_new_block(message.data)
         elif message.type == "VOTE":
-            self.handle_vote(message.data) 
\ No newline at end of file
+            self.handle_vote(message.data) 
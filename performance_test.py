@@ -17,16 +17,28 @@ class PerformanceTester:
         self.validator_count = validator_count
         self.is_running = True
         self.consensus = None
+        self._random_ids: List[int] = []  # 预先生成的随机数缓冲区
+        self._random_cursor = 0
         
     def stop(self):
         """停止测试"""
         print("\n正在停止测试...")
         self.is_running = False
                 
+    def _fill_random_ids(self, count: int):
+        """一次性批量生成随机数，避免在出块循环中逐个调用 random.randint"""
+        self._random_ids = random.choices(range(1000001), k=count)
+        self._random_cursor = 0
+                
     async def generate_transactions(self) -> List[str]:
         """生成测试交易"""
-        return [f"tx_{i}_{random.randint(0, 1000000)}" 
-                for i in range(self.batch_size)]
+        start = self._random_cursor
+        if start + self.batch_size > len(self._random_ids):
+            self._fill_random_ids(max(self.transaction_count, self.batch_size))
+            start = 0
+        self._random_cursor = start + self.batch_size
+        return [f"tx_{i}_{r}" 
+                for i, r in enumerate(self._random_ids[start:start + self.batch_size])]
                 
     async def run_test(self):
         """运行性能测试"""
@@ -42,21 +54,23 @@ class PerformanceTester:
             dpos.register_validator(validator)
             
         dpos.update_active_validators()
+        self._fill_random_ids(self.transaction_count + self.batch_size)
         
-        # 开始性能监控
-        start_time = time.time()
+        # 开始性能监控（系统指标由后台任务每秒采样一次）
+        start_time = time.perf_counter()
         processed_tx = 0
+        monitor = self.consensus.performance_monitor
+        monitor.start_sampling()
         
         try:
             while processed_tx < self.transaction_count and self.is_running:
                 transactions = await self.generate_transactions()
                 validator = dpos.get_next_block_validator()
-                block_start = time.time()
+                block_start = time.perf_counter()
                 block = self.consensus.create_block(validator, transactions)
                 
-                latency = time.time() - block_start
-                self.consensus.performance_monitor.record_transaction_latency(latency)
-                self.consensus.performance_monitor.collect_system_metrics()
+                latency = time.perf_counter() - block_start
+                monitor.record_transaction_latency(latency)
                 
                 processed_tx += len(transactions)
                 print(f"\r进度: {processed_tx}/{self.transaction_count} 交易", end="")
@@ -66,7 +80,9 @@ class PerformanceTester:
         except KeyboardInterrupt:
             print("\n检测到用户中断...")
         finally:
-            duration = time.time() - start_time
+            monitor.stop_sampling()
+            monitor.collect_system_metrics()  # 结束时补采一次，保证短测试也有样本
+            duration = time.perf_counter() - start_time
             print(f"\n测试运行时间: {duration:.2f} 秒")
             report = self.consensus.performance_monitor.generate_report()
             self._print_report(report)
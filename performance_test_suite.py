@@ -1,14 +1,16 @@
 import asyncio
 import time
+import unicodedata
+from dataclasses import dataclass
 from typing import Dict, List
 from performance_test import PerformanceTester
 
+@dataclass(frozen=True, slots=True)
 class TestScenario:
-    def __init__(self, name: str, tx_count: int, batch_size: int, validator_count: int):
-        self.name = name
-        self.tx_count = tx_count
-        self.batch_size = batch_size
-        self.validator_count = validator_count
+    name: str
+    tx_count: int
+    batch_size: int
+    validator_count: int
 
 class PerformanceTestSuite:
     def __init__(self):
@@ -45,9 +47,9 @@ class PerformanceTestSuite:
             )
             
             # 运行测试并收集结果
-            start_time = time.time()
+            start_time = time.perf_counter()
             await tester.run_test()
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             
             # 保存结果
             self.results[scenario.name] = {
@@ -97,40 +99,50 @@ class PerformanceTestSuite:
         print("\n性能优化建议:")
         self._generate_recommendations()
 
+    @staticmethod
+    def _display_width(text: str) -> int:
+        """终端显示宽度：全角/宽字符（如中文）占两列"""
+        east_asian_width = unicodedata.east_asian_width
+        return sum(2 if east_asian_width(c) in ("W", "F") else 1 for c in text)
+
     def _print_table(self, headers: List[str], rows: List[List[str]]):
-        # 计算每列的最大宽度
-        widths = [max(len(str(row[i])) for row in [headers] + rows) for i in range(len(headers))]
+        # 每个单元格只计算一次显示宽度，列宽与填充都复用该结果
+        table = [[(str(cell), self._display_width(str(cell))) for cell in row] for row in [headers] + rows]
+        widths = [max(row[i][1] for row in table) for i in range(len(headers))]
+        
+        def format_row(row) -> str:
+            return " | ".join(cell + " " * (w - cw) for (cell, cw), w in zip(row, widths))
         
         # 打印表头
-        header = " | ".join(f"{h:<{w}}" for h, w in zip(headers, widths))
-        print("-" * len(header))
+        header = format_row(table[0])
+        line = "-" * (sum(widths) + 3 * (len(widths) - 1))
+        print(line)
         print(header)
-        print("-" * len(header))
+        print(line)
         
         # 打印数据行
-        for row in rows:
-            print(" | ".join(f"{cell:<{w}}" for cell, w in zip(row, widths)))
-        print("-" * len(header))
+        for row in table[1:]:
+            print(format_row(row))
+        print(line)
 
     def _generate_recommendations(self):
-        # 分析结果并生成优化建议
-        max_tps = max(r["metrics"]["tps"] for r in self.results.values())
-        max_tps_scenario = next(name for name, r in self.results.items() 
-                              if r["metrics"]["tps"] == max_tps)
+        # 分析结果并生成优化建议（先按场景抽出TPS列，之后的判断都是字典查找）
+        tps = {name: r["metrics"]["tps"] for name, r in self.results.items()}
+        max_tps_scenario = max(tps, key=tps.get)
         
         print(f"1. 最佳TPS配置在 '{max_tps_scenario}' 场景中实现")
         
         # 分析批次大小的影响
-        small_batch = self.results["小批量交易"]["metrics"]["tps"]
-        large_batch = self.results["高TPS测试"]["metrics"]["tps"]
+        small_batch = tps["小批量交易"]
+        large_batch = tps["高TPS测试"]
         if large_batch > small_batch:
             print("2. 增加批次大小可以提高TPS，建议优化批处理机制")
         else:
             print("2. 小批量处理表现更好，建议关注单笔交易处理效率")
         
         # 分析验证者数量的影响
-        base_tps = self.results["基准测试"]["metrics"]["tps"]
-        large_validator_tps = self.results["大规模验证者"]["metrics"]["tps"]
+        base_tps = tps["基准测试"]
+        large_validator_tps = tps["大规模验证者"]
         if large_validator_tps < base_tps * 0.8:
             print("3. 验证者数量增加显著影响性能，建议优化共识机制")
 
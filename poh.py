@@ -1,94 +1,124 @@
 import hashlib
+import itertools
 import time
-from dataclasses import dataclass
-from typing import Optional, List
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Optional, Union
+
+def poh_chain(seed: bytes, iterations: int) -> bytes:
+    """
+    对种子连续执行 iterations 次 SHA-256，返回最终摘要
+    （哈希链的唯一原语，tick 与 verify 共用）
+    """
+    sha256 = hashlib.sha256
+    current_hash = seed
+    for _ in range(iterations):
+        current_hash = sha256(current_hash).digest()
+    return current_hash
 
 @dataclass
 class HistoryNode:
     """历史节点数据结构"""
     sequence: int          # 序列号
     hash: str             # 当前哈希值
-    data: Optional[str]   # 可选的交易数据
+    data: Optional[Union[str, bytes]]  # 可选的交易数据（tick_bytes 写入的为原始字节）
     timestamp: float      # 时间戳
     counter: int          # 计数器
+    hash_bytes: bytes = field(default=b"", repr=False, compare=False)  # 哈希值的原始字节
 
 class ProofOfHistory:
-    def __init__(self, difficulty: int = 8):
+    def __init__(self, difficulty: int = 8, history_size: int = 65536):
         """
         初始化 POH
         :param difficulty: 哈希计算的难度（每次计算的循环次数）
+        :param history_size: 保留的最近历史节点数量，更早的节点被丢弃以限制内存
         """
         self.difficulty = difficulty
-        self.history: List[HistoryNode] = []
+        self.history: Deque[HistoryNode] = deque(maxlen=history_size)
         # 创建创世节点
         genesis = HistoryNode(
             sequence=0,
             hash="0" * 64,
             data=None,
             timestamp=time.time(),
-            counter=0
+            counter=0,
+            hash_bytes=bytes(32)
         )
         self.history.append(genesis)
+        self._last_node = genesis  # 最新节点，tick 时无需索引 history
 
-    def _hash(self, previous_hash: str, data: Optional[str] = None) -> str:
+    def _hash(self, previous_hash: bytes, data: Optional[bytes] = None) -> bytes:
         """
-        计算哈希值
+        计算哈希值（直接对32字节摘要计算，避免每轮十六进制编解码）
         """
-        hasher = hashlib.sha256()
-        hasher.update(previous_hash.encode())
         if data:
-            hasher.update(data.encode())
-        return hasher.hexdigest()
+            return hashlib.sha256(previous_hash + data).digest()
+        return hashlib.sha256(previous_hash).digest()
 
     def tick(self, data: Optional[str] = None) -> HistoryNode:
         """
         生成下一个历史节点
         :param data: 可选的交易数据
         """
-        previous_node = self.history[-1]
-        current_hash = previous_node.hash
+        return self._append(data, data.encode() if data else None)
+
+    def tick_bytes(self, payload: bytes) -> HistoryNode:
+        """
+        以原始字节作为交易数据生成下一个历史节点（省去字符串构造与编码）
+        :param payload: 交易数据
+        """
+        return self._append(payload, payload)
+
+    def _append(self, data: Optional[Union[str, bytes]], payload: Optional[bytes]) -> HistoryNode:
+        """
+        计算并追加历史节点
+        :param data: 节点中记录的交易数据
+        :param payload: 参与哈希计算的数据字节
+        """
+        previous_node = self._last_node
         
         # 执行指定次数的哈希计算
-        for _ in range(self.difficulty):
-            current_hash = self._hash(current_hash)
+        current_hash = poh_chain(previous_node.hash_bytes, self.difficulty)
         
         # 如果有数据，将数据加入最后一次哈希计算
-        if data:
-            current_hash = self._hash(current_hash, data)
+        if payload:
+            current_hash = self._hash(current_hash, payload)
         
-        # 创建新节点
+        # 创建新节点（只在最后转换一次十六进制）
         new_node = HistoryNode(
             sequence=previous_node.sequence + 1,
-            hash=current_hash,
+            hash=current_hash.hex(),
             data=data,
             timestamp=time.time(),
-            counter=previous_node.counter + self.difficulty + (1 if data else 0)
+            counter=previous_node.counter + self.difficulty + (1 if payload else 0),
+            hash_bytes=current_hash
         )
         
         self.history.append(new_node)
+        self._last_node = new_node
         return new_node
 
     def verify(self, start_index: int, end_index: int) -> bool:
         """
-        验证历史记录的完整性
+        验证历史记录的完整性（下标相对于当前保留的历史窗口）
         """
         if start_index < 0 or end_index >= len(self.history):
             return False
             
-        for i in range(start_index, end_index):
-            current_node = self.history[i]
-            next_node = self.history[i + 1]
-            
+        # 顺序遍历窗口，避免对 deque 做中间位置的随机索引
+        nodes = itertools.islice(self.history, start_index, end_index + 1)
+        current_node = next(nodes, None)
+        for next_node in nodes:
             # 验证哈希链
-            current_hash = current_node.hash
-            for _ in range(self.difficulty):
-                current_hash = self._hash(current_hash)
+            current_hash = poh_chain(current_node.hash_bytes, self.difficulty)
                 
-            if next_node.data:
-                current_hash = self._hash(current_hash, next_node.data)
+            data = next_node.data
+            if data:
+                current_hash = self._hash(current_hash, data if isinstance(data, bytes) else data.encode())
                 
-            if current_hash != next_node.hash:
+            if current_hash.hex() != next_node.hash:
                 return False
+            current_node = next_node
                 
         return True
 
@@ -1,8 +1,10 @@
 import asyncio
 import time
 from poh import ProofOfHistory
-from dpos import DPOS, POHWithDPOS, ConsensusSystem
+from blockchain import Block
+from dpos import DPOS, POHWithDPOS, ConsensusSystem, ForkChoice, BlockConfirmation
 from network import NetworkMessage, Node, P2PNetwork
+from transaction_pool import TransactionPool, Transaction
 
 async def test_consensus_system():
     print("开始测试共识系统...")
@@ -87,6 +89,230 @@ async def test_consensus_system():
     
     print("\n测试完成!")
 
+def _make_block(height: int, previous_hash: str, tag: str) -> Block:
+    return Block(
+        height=height,
+        timestamp=0.0,
+        previous_hash=previous_hash,
+        transactions=[tag],
+        validator="v",
+        signature="",
+        poh_hash="0" * 64
+    )
+
+def test_fork_choice():
+    print("\n测试分叉选择:")
+    fork_choice = ForkChoice()
+    genesis = _make_block(0, "0" * 64, "genesis")
+    fork_choice.add_block(genesis)
+    
+    # 短分叉 A 先到达，成为链头
+    a1 = _make_block(1, genesis.hash, "a1")
+    fork_choice.add_block(a1)
+    assert fork_choice.head == a1.hash
+    
+    # 更长的分叉 B 到达后切换到更重的链头
+    b1 = _make_block(1, genesis.hash, "b1")
+    b2 = _make_block(2, b1.hash, "b2")
+    fork_choice.add_block(b1)
+    assert fork_choice.head == a1.hash  # 权重相同时保持原链头
+    fork_choice.add_block(b2)
+    assert fork_choice.head == b2.hash
+    print(f"切换到更重的链头: {fork_choice.head}")
+    
+    # 高度不连续的子区块及其后代都不能成为链头
+    bad = _make_block(5, b2.hash, "bad")
+    bad_child = _make_block(6, bad.hash, "bad_child")
+    fork_choice.add_block(bad)
+    fork_choice.add_block(bad_child)
+    assert fork_choice.head == b2.hash
+    fork_choice.select_best_chain()
+    assert fork_choice.head == b2.hash
+    print("高度无效的分叉未成为链头")
+
+def _tx(tx_id: str, gas_price: float, size: int = 1, timestamp: float = 1.0) -> Transaction:
+    return Transaction(tx_id=tx_id, data="", timestamp=timestamp, gas_price=gas_price, size=size)
+
+async def test_pool_priority():
+    print("\n测试交易池出批顺序与淘汰:")
+    # 按 gas 价格从高到低出批，同价同时间按入池顺序
+    pool = TransactionPool()
+    for i in range(12):
+        await pool.add_transaction(_tx(f"tx_{i}", 1.0))
+    await pool.add_transaction(_tx("rich", 2.0))
+    assert [tx.tx_id for tx in pool.get_batch(4)] == ["rich", "tx_0", "tx_1", "tx_2"]
+    assert pool.size == 13  # 选批不移除交易
+    
+    # 容量淘汰：满池时更高价的交易挤掉最低价的交易
+    pool = TransactionPool(max_size=3)
+    for tx_id, gas_price in [("low", 1), ("mid", 2), ("high", 3)]:
+        await pool.add_transaction(_tx(tx_id, gas_price, size=10))
+    assert not await pool.add_transaction(_tx("cheap", 0.5, size=10))
+    assert await pool.add_transaction(_tx("top", 4, size=7))
+    assert sorted(pool.pending_txs) == ["high", "mid", "top"]
+    assert pool.memory_size == 27
+    assert [tx.tx_id for tx in pool.get_batch(max_bytes=100)] == ["top", "high", "mid"]
+    print("出批顺序与容量淘汰正确")
+
+async def _budget_pool() -> TransactionPool:
+    pool = TransactionPool()
+    for tx_id, gas_price, size in [("a", 5, 60), ("b", 4, 50), ("c", 3, 30), ("d", 2, 10)]:
+        await pool.add_transaction(_tx(tx_id, gas_price, size))
+    return pool
+
+async def test_batch_byte_budget():
+    print("\n测试出批字节预算:")
+    # 放不下的交易被跳过，后续较小的交易仍可入批；预算恰好用尽时停止
+    pool = await _budget_pool()
+    assert [tx.tx_id for tx in pool.get_batch(max_bytes=100)] == ["a", "c", "d"]
+    assert [tx.tx_id for tx in pool.get_batch(max_bytes=60)] == ["a"]
+    assert [tx.tx_id for tx in pool.get_batch(max_bytes=5)] == []
+    assert pool.size == 4
+    print("字节预算正确")
+
+async def test_lazy_removal():
+    print("\n测试交易移除与重新提交:")
+    pool = await _budget_pool()
+    
+    # 移除后重新提交：旧堆条目不影响新交易，大小统计准确
+    await pool.remove_transactions(["a", "c"])
+    assert pool.size == 2 and pool.memory_size == 60
+    assert await pool.add_transaction(_tx("a", 1, 5))
+    assert [tx.tx_id for tx in pool.get_batch()] == ["b", "d", "a"]
+    assert pool.memory_size == 65
+    
+    # 反复移除并重新提交同一交易：堆中的失效条目有上限，结果保持正确
+    for _ in range(100):
+        await pool.remove_transactions(["b"])
+        assert await pool.add_transaction(_tx("b", 4, 50))
+    assert len(pool.priority_queue) <= 2 * pool.size + 1
+    assert [tx.tx_id for tx in pool.get_batch()] == ["b", "d", "a"]
+    assert pool.memory_size == 65
+    print("移除与重新提交统计正确")
+
+async def test_ingest_ring():
+    print("\n测试单写入环形缓冲区:")
+    # 单写入模式：读取前并入环形缓冲区，缓冲区满时就地并入，不丢交易
+    pool = TransactionPool(single_writer=True, ring_capacity=2)
+    for i, gas_price in enumerate([1, 3, 2]):
+        assert await pool.add_transaction(_tx(f"r{i}", gas_price))
+    assert len(pool.pending_txs) == 2  # 第三笔写入前缓冲区已满，前两笔被并入
+    assert pool.size == 3
+    assert await pool.add_transaction(_tx("r3", 5))
+    assert [tx.tx_id for tx in pool.get_batch()] == ["r3", "r1", "r2", "r0"]
+    
+    # 并入时照常校验：重复ID与低价交易被丢弃
+    assert await pool.add_transaction(_tx("r0", 9))
+    assert await pool.add_transaction(_tx("low", 0.01))
+    assert pool.size == 4 and pool.memory_size == 4
+    print("环形缓冲区并入正确")
+
+async def test_pre_validated():
+    print("\n测试预校验交易:")
+    # pre_validated 只跳过重复ID检查，gas价格与大小仍会校验
+    for single_writer in (False, True):
+        pool = TransactionPool(single_writer=single_writer)
+        await pool.add_transaction(_tx("neg", 1, size=-3), pre_validated=True)
+        await pool.add_transaction(_tx("cheap", 0.01), pre_validated=True)
+        assert await pool.add_transaction(_tx("ok", 1, size=4), pre_validated=True)
+        assert pool.size == 1 and pool.memory_size == 4
+    print("预校验交易仍检查gas价格与大小")
+
+def test_confirmation_ids():
+    print("\n测试区块确认的验证者ID:")
+    dpos = DPOS()
+    for i in range(50):
+        dpos.stake(f"staker{i}", 1)  # 普通质押账户不占用验证者ID
+    for v in ["v0", "v1", "v2"]:
+        dpos.stake(v, 100)
+        assert dpos.register_validator(v)
+    assert [dpos.validator_id(v) for v in ["v0", "v1", "v2"]] == [0, 1, 2]
+    assert dpos.validator_id("staker0") is None
+    assert dpos.address_of(2) == "v2"
+    
+    confirmation = BlockConfirmation(required_confirmations=2, id_of=dpos.validator_id)
+    assert not confirmation.vote_block("h", "staker0")  # 未注册的地址投票无效
+    assert not confirmation.vote_block("h", "outsider")
+    assert confirmation.get_block_votes("h") == 0
+    assert not confirmation.vote_block("h", "v2")
+    assert not confirmation.vote_block("h", "v2")  # 重复投票不计数
+    assert confirmation.vote_block("h", "v0")
+    assert confirmation.get_block_votes("h") == 2
+    assert confirmation.block_votes["h"].bit_length() <= 3
+    print("未注册地址的投票被拒绝")
+
+def test_network_peers():
+    print("\n测试节点增删与广播:")
+    network = P2PNetwork()
+    a, b = Node("a"), Node("b")
+    network.add_peer(a)
+    network.add_peer(b)
+    network.broadcast(NetworkMessage("PING", {}))
+    assert len(a.messages) == 1 and len(b.messages) == 1
+    
+    network.remove_peer("a")
+    network.remove_peer("missing")  # 移除不存在的节点不报错
+    network.broadcast(NetworkMessage("PING", {}))
+    assert len(a.messages) == 1 and len(b.messages) == 2
+    assert list(network.peers) == ["b"]
+    
+    # peers 为只读视图，绕过 add_peer 的写入会直接报错
+    try:
+        network.peers["c"] = Node("c")
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("peers 不应允许直接写入")
+    print("广播只送达当前节点")
+
+def test_poh_window():
+    print("\n测试 POH 历史窗口:")
+    poh = ProofOfHistory(difficulty=2, history_size=4)
+    for i in range(10):
+        poh.tick(f"tx{i}" if i % 2 else None)
+    
+    # 只保留最近的节点，下标相对于当前窗口
+    assert len(poh.history) == 4
+    assert poh.history[0].sequence == 7 and poh.history[-1].sequence == 10
+    assert poh.verify(0, 3)
+    assert poh.verify(2, 2)
+    assert not poh.verify(0, 4)  # 超出窗口
+    
+    # 窗口内被篡改的节点仍能被发现
+    poh.history[2].hash = "f" * 64
+    assert not poh.verify(0, 3)
+    print("窗口内历史验证正确")
+
+def test_poh_tick_bytes():
+    print("\n测试 POH 字节打点:")
+    text_poh = ProofOfHistory(difficulty=3)
+    bytes_poh = ProofOfHistory(difficulty=3)
+    
+    # 相同内容以字符串或原始字节打点，哈希链一致
+    for payload in ["tx_a", "tx_b"]:
+        text_node = text_poh.tick(payload)
+        bytes_node = bytes_poh.tick_bytes(payload.encode())
+        assert text_node.hash == bytes_node.hash
+        assert bytes_node.data == payload.encode()
+    bytes_poh.tick_bytes(bytes(32))
+    assert bytes_poh.history[-1].counter == 3 * 3 + 3
+    assert bytes_poh.verify(0, len(bytes_poh.history) - 1)
+    
+    # 篡改字节数据后验证失败
+    bytes_poh.history[1].data = b"tx_evil"
+    assert not bytes_poh.verify(0, len(bytes_poh.history) - 1)
+    print("字节打点与字符串打点一致")
+
 if __name__ == "__main__":
     # 运行测试
-    asyncio.run(test_consensus_system()) 
\ No newline at end of file
+    asyncio.run(test_consensus_system())
+    test_fork_choice()
+    asyncio.run(test_pool_priority())
+    asyncio.run(test_batch_byte_budget())
+    asyncio.run(test_lazy_removal())
+    asyncio.run(test_ingest_ring())
+    asyncio.run(test_pre_validated())
+    test_confirmation_ids()
+    test_network_peers()
+    test_poh_window()
+    test_poh_tick_bytes() 
\ No newline at end of file
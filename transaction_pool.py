@@ -1,11 +1,12 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import time
 import asyncio
+import itertools
 from dataclasses import dataclass
 from collections import OrderedDict
 import heapq
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Transaction:
     """交易数据结构"""
     tx_id: str
@@ -14,104 +15,215 @@ class Transaction:
     gas_price: float
     size: int
 
+class SPSCTransactionRing:
+    """单生产者/单消费者的定长环形缓冲区，写入与取出都只做下标运算，无需加锁
+    （每个槽位存放 (交易, 是否已由调用方校验)）"""
+    __slots__ = ("capacity", "buf", "head", "tail")
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buf: List[Optional[Tuple[Transaction, bool]]] = [None] * capacity
+        self.head = 0  # 下一个写入位置（只增不减）
+        self.tail = 0  # 下一个读取位置（只增不减）
+        
+    def __len__(self) -> int:
+        return self.head - self.tail
+        
+    def push(self, tx: Transaction, pre_validated: bool = False) -> bool:
+        """写入一笔交易，缓冲区已满时返回 False"""
+        if self.head - self.tail >= self.capacity:
+            return False
+        self.buf[self.head % self.capacity] = (tx, pre_validated)
+        self.head += 1
+        return True
+        
+    def drain(self) -> List[Tuple[Transaction, bool]]:
+        """按写入顺序取出全部交易，并释放槽位上的引用"""
+        buf, capacity, head = self.buf, self.capacity, self.head
+        items = []
+        for i in range(self.tail, head):
+            slot = i % capacity
+            items.append(buf[slot])
+            buf[slot] = None
+        self.tail = head
+        return items
+
 class TransactionPool:
     def __init__(self, 
                  max_size: int = 100000,
                  max_batch_size: int = 5000,
-                 min_gas_price: float = 0.1):
+                 min_gas_price: float = 0.1,
+                 single_writer: bool = False,
+                 ring_capacity: int = 65536):
         """
         初始化交易池
         :param max_size: 交易池最大容量
         :param max_batch_size: 单个批次最大交易数
         :param min_gas_price: 最低gas价格
+        :param single_writer: 只有一个写入任务时置为 True，add_transaction 写入无锁环形缓冲区，
+                              读取交易池前再批量并入堆中（校验在并入时进行，不合格的交易被丢弃；
+                              pre_validated 标记随交易一同写入缓冲区，并入时同样生效）
+        :param ring_capacity: 单写入模式下环形缓冲区的容量
         """
         self.max_size = max_size
         self.max_batch_size = max_batch_size
         self.min_gas_price = min_gas_price
         
         self.pending_txs: OrderedDict[str, Transaction] = OrderedDict()
-        self.priority_queue: List[tuple[float, str]] = []  # (gas_price, tx_id)
+        # 出块选择用的最大堆，顺序与按 (-gas_price, timestamp) 的稳定排序一致：同价同时间时先入池者优先
+        self.priority_queue: List[tuple[float, float, int, str]] = []  # (-gas_price, timestamp, seq, tx_id)
+        self._seq = itertools.count()  # 入池序号，单调递增
+        self._seq_of: Dict[str, int] = {}  # 待处理交易 -> 当前有效条目的入池序号
+        # 容量淘汰用的最小堆
+        self._eviction_queue: List[tuple[float, int, str]] = []  # (gas_price, seq, tx_id)
+        # 惰性删除：堆条目的 seq 与 _seq_of 中记录的一致才有效，已移除或被重新提交的旧条目出堆或压缩时丢弃
         self._lock = asyncio.Lock()
         self.total_size = 0
+        self._ring: Optional[SPSCTransactionRing] = SPSCTransactionRing(ring_capacity) if single_writer else None
         
-    async def add_transaction(self, tx: Transaction) -> bool:
-        """添加新交易到交易池"""
+    async def add_transaction(self, tx: Transaction, *, pre_validated: bool = False) -> bool:
+        """
+        添加新交易到交易池
+        :param tx: 待添加的交易
+        :param pre_validated: 调用方已保证交易ID不重复时置为 True，跳过重复ID检查（gas价格与大小仍会校验）
+        """
+        # 单写入模式：只写环形缓冲区，返回值仅表示是否写入成功；缓冲区满时先就地并入一次
+        ring = self._ring
+        if ring is not None:
+            if ring.push(tx, pre_validated):
+                return True
+            self._drain_ring()
+            return ring.push(tx, pre_validated)
         async with self._lock:
-            # 验证交易
-            if not self._validate_transaction(tx):
+            return self._insert(tx, pre_validated)
+            
+    def _insert(self, tx: Transaction, pre_validated: bool = False) -> bool:
+        """校验并将交易加入交易池及两个堆（调用方负责互斥）"""
+        # 验证交易
+        if not self._validate_transaction(tx, check_duplicate=not pre_validated):
+            return False
+            
+        # 检查容量
+        if len(self.pending_txs) >= self.max_size:
+            # 如果新交易gas价格更高,清除最低价格的交易
+            self._skip_removed(self._eviction_queue)
+            if self._eviction_queue[0][0] < tx.gas_price:
+                removed_tx_id = heapq.heappop(self._eviction_queue)[-1]
+                removed_tx = self.pending_txs.pop(removed_tx_id)
+                del self._seq_of[removed_tx_id]  # 最大堆中的条目惰性丢弃
+                self.total_size -= removed_tx.size
+                self._maybe_compact()
+            else:
                 return False
                 
-            # 检查容量
-            if len(self.pending_txs) >= self.max_size:
-                # 如果新交易gas价格更高,清除最低价格的交易
-                if self.priority_queue[0][0] < tx.gas_price:
-                    _, removed_tx_id = heapq.heappop(self.priority_queue)
-                    removed_tx = self.pending_txs.pop(removed_tx_id)
-                    self.total_size -= removed_tx.size
-                else:
-                    return False
-                    
-            # 添加交易
-            self.pending_txs[tx.tx_id] = tx
-            heapq.heappush(self.priority_queue, (tx.gas_price, tx.tx_id))
-            self.total_size += tx.size
-            return True
-            
-    def get_batch(self, max_size: Optional[int] = None) -> List[Transaction]:
-        """获取待处理的交易批次"""
+        # 添加交易
+        seq = next(self._seq)
+        self.pending_txs[tx.tx_id] = tx
+        self._seq_of[tx.tx_id] = seq
+        heapq.heappush(self.priority_queue, (-tx.gas_price, tx.timestamp, seq, tx.tx_id))
+        heapq.heappush(self._eviction_queue, (tx.gas_price, seq, tx.tx_id))
+        self.total_size += tx.size
+        return True
+        
+    def get_batch(self, max_size: Optional[int] = None, max_bytes: Optional[int] = None) -> List[Transaction]:
+        """
+        获取待处理的交易批次
+        :param max_size: 批次最大交易数，默认为 max_batch_size
+        :param max_bytes: 批次总大小上限，默认为交易池容量 max_size
+        """
+        self._drain_ring()
         batch_size = max_size or self.max_batch_size
+        byte_budget = self.max_size if max_bytes is None else max_bytes
         batch: List[Transaction] = []
         current_size = 0
         
-        # 优先选择gas价格高的交易
-        sorted_txs = sorted(
-            self.pending_txs.values(),
-            key=lambda x: (-x.gas_price, x.timestamp)
-        )
-        
-        for tx in sorted_txs:
-            if len(batch) >= batch_size:
+        # 优先选择gas价格高的交易：从最大堆依次弹出，只访问被选中的前若干笔
+        queue = self.priority_queue
+        pending_txs = self.pending_txs
+        popped = []
+        # 交易大小均为正数，预算用尽后不可能再放入任何交易
+        while len(batch) < batch_size and current_size < byte_budget:
+            entry = self._pop_valid(queue)
+            if entry is None:
                 break
-            if current_size + tx.size <= self.max_size:
+            popped.append(entry)
+            tx = pending_txs[entry[-1]]
+            if current_size + tx.size <= byte_budget:
                 batch.append(tx)
                 current_size += tx.size
                 
+        # 选批不移除交易，弹出的条目放回堆中
+        for entry in popped:
+            heapq.heappush(queue, entry)
         return batch
         
     async def remove_transactions(self, tx_ids: List[str]):
-        """移除已处理的交易"""
+        """移除已处理的交易（堆条目只做标记，出堆或压缩时再丢弃）"""
         async with self._lock:
+            self._drain_ring()
             for tx_id in tx_ids:
                 if tx_id in self.pending_txs:
                     tx = self.pending_txs.pop(tx_id)
+                    del self._seq_of[tx_id]
                     self.total_size -= tx.size
-                    # 更新优先队列
-                    self.priority_queue = [
-                        (p, tid) for p, tid in self.priority_queue 
-                        if tid != tx_id
-                    ]
-                    heapq.heapify(self.priority_queue)
                     
-    def _validate_transaction(self, tx: Transaction) -> bool:
-        """验证交易有效性"""
+            self._maybe_compact()
+                
+    def _drain_ring(self):
+        """把环形缓冲区中积压的交易批量并入交易池"""
+        ring = self._ring
+        if ring is not None and len(ring):
+            for tx, pre_validated in ring.drain():
+                self._insert(tx, pre_validated)
+                
+    def _skip_removed(self, queue: list):
+        """弹出堆顶已失效的条目，使堆顶为有效交易"""
+        seq_of = self._seq_of
+        while queue and seq_of.get(queue[0][-1]) != queue[0][-2]:
+            heapq.heappop(queue)
+            
+    def _pop_valid(self, queue: list) -> Optional[tuple]:
+        """弹出并返回堆顶的有效条目，堆为空时返回 None"""
+        self._skip_removed(queue)
+        return heapq.heappop(queue) if queue else None
+        
+    def _maybe_compact(self):
+        """失效条目多于有效交易时整体重建一次，限制堆的膨胀"""
+        if max(len(self.priority_queue), len(self._eviction_queue)) > 2 * len(self.pending_txs):
+            self._compact()
+            
+    def _compact(self):
+        """按当前待处理交易重建两个堆，丢弃所有失效条目"""
+        txs = self.pending_txs.values()
+        seq_of = self._seq_of
+        self.priority_queue = [(-tx.gas_price, tx.timestamp, seq_of[tx.tx_id], tx.tx_id) for tx in txs]
+        self._eviction_queue = [(tx.gas_price, seq_of[tx.tx_id], tx.tx_id) for tx in txs]
+        heapq.heapify(self.priority_queue)
+        heapq.heapify(self._eviction_queue)
+                    
+    def _validate_transaction(self, tx: Transaction, check_duplicate: bool = True) -> bool:
+        """验证交易有效性（check_duplicate 为 False 时省去交易池成员检查）"""
         return (
             tx.gas_price >= self.min_gas_price and
             tx.size > 0 and
-            tx.tx_id not in self.pending_txs
+            (not check_duplicate or tx.tx_id not in self.pending_txs)
         )
         
     @property
     def size(self) -> int:
         """当前交易池大小"""
+        self._drain_ring()
         return len(self.pending_txs)
         
     @property
     def memory_size(self) -> int:
         """当前占用内存大小(bytes)"""
+        self._drain_ring()
         return self.total_size
         
     def clear_expired(self, max_age: float = 3600):
         """清理过期交易"""
+        self._drain_ring()
         current_time = time.time()
         expired_txs = [
             tx_id for tx_id, tx in self.pending_txs.items()